@@ -1,13 +1,19 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 import io
-import json
+from functools import lru_cache, partial
+import shutil
 import tempfile
+import threading
+import time
+import random
+from collections import OrderedDict
+import orjson
 import pandas as pd
-from geopy.geocoders import Nominatim
+import requests
 from datetime import datetime
 from pvlib import pvsystem
 
@@ -33,22 +39,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _records(df: pd.DataFrame) -> orjson.Fragment:
+    # already-serialized JSON, embedded as-is instead of parsed back into Python objects
+    return orjson.Fragment(df.to_json(orient="records", date_format="iso"))
+
+def _json_response(content: dict) -> Response:
+    body = orjson.dumps(content, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return Response(content=body, media_type="application/json")
+
 class LocationQuery(BaseModel):
     query: str
 
 PVGIS_HOURLY_MIN_YEAR = 2005
 PVGIS_HOURLY_MAX_YEAR = 2023
 
+_TRANSIENT_STATUS = {429, 502, 503, 504}
+# failed/refused connections (incl. connect timeouts). Read timeouts are not retried:
+# a 60 s NASA read that timed out once would just stall the request again. pvlib
+# re-raises PVGIS error bodies as HTTPError without a response, so those carry no
+# status and are not retried either
+_NETWORK_ERRORS = (requests.ConnectionError,)
+# no new attempt is started if it could push a request past this many seconds
+_RETRY_DEADLINE = 20.0
+# at most two in-flight network calls per upstream and process; only the network
+# request holds a slot, cache hits never wait. A caller that can't get a slot within
+# _GATE_TIMEOUT seconds gets a 503 instead of queueing behind stalled fetches
+_WEATHER_GATE = threading.Semaphore(2)
+_GEOCODER_GATE = threading.Semaphore(2)
+_GATE_TIMEOUT = 15.0
+
+class UpstreamBusy(Exception):
+    """No upstream slot freed up within _GATE_TIMEOUT."""
+
+def _is_transient(e: Exception, retry_on: tuple) -> bool:
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code in _TRANSIENT_STATUS
+    return isinstance(e, retry_on)
+
+def _with_backoff(fn, *args, gate, tries=3, base=0.5, retry_on=(), **kwargs):
+    """Call fn under gate, retrying HTTP 429/5xx gateway errors and ``retry_on`` exceptions with exponential backoff."""
+    start = time.monotonic()
+    for attempt in range(tries):
+        delay = base * 2 ** attempt + random.random() * 0.1
+        if not gate.acquire(timeout=_GATE_TIMEOUT):
+            raise UpstreamBusy("Upstream services are busy, please try again")
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            out_of_time = time.monotonic() - start + delay > _RETRY_DEADLINE
+            if attempt == tries - 1 or out_of_time or not _is_transient(e, retry_on):
+                raise
+        finally:
+            gate.release()
+        time.sleep(delay)
+
+# handed to the core.adapters fetchers, which only route their network request through it
+_weather_upstream = partial(_with_backoff, gate=_WEATHER_GATE, retry_on=_NETWORK_ERRORS)
+
+@lru_cache(maxsize=1)
+def _geocoder():
+    # geopy is only needed for location search; keep it off the cold-start path
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="pvlib_gui")
+
+@lru_cache(maxsize=256)
+def _geocode(query: str):
+    # repeated searches stay off the network (Nominatim allows 1 req/sec)
+    from geopy.exc import GeocoderRateLimited, GeocoderUnavailable
+    loc = _with_backoff(_geocoder().geocode, query, timeout=10, gate=_GEOCODER_GATE,
+                        retry_on=(GeocoderRateLimited, GeocoderUnavailable))
+    if loc is None:
+        return None
+    return loc.latitude, loc.longitude, loc.address
+
 @app.post("/api/location/search")
 def search_location(body: LocationQuery):
-    geocoder = Nominatim(user_agent="pvlib_gui")
-    loc = geocoder.geocode(body.query, timeout=10)
-    if loc:
-        tz_name = tz_name_from_latlon(loc.latitude, loc.longitude)
+    try:
+        hit = _geocode(body.query.strip())
+    except UpstreamBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if hit:
+        lat, lon, address = hit
+        tz_name = tz_name_from_latlon(lat, lon)
         return {
-            "lat": loc.latitude,
-            "lon": loc.longitude,
-            "address": loc.address,
+            "lat": lat,
+            "lon": lon,
+            "address": address,
             "timezone": tz_name
         }
     raise HTTPException(status_code=404, detail="Location not found")
@@ -74,15 +150,17 @@ def fetch_weather(body: FetchQuery):
                     detail=f"PVGIS Hourly supports years {PVGIS_HOURLY_MIN_YEAR}–{PVGIS_HOURLY_MAX_YEAR}. "
                            f"Year {body.year} is out of range. Use PVGIS TMY or NASA POWER instead."
                 )
-            df, meta = fetch_pvgis_hourly(body.lat, body.lon, body.year, body.tz_name)
+            df, meta = fetch_pvgis_hourly(body.lat, body.lon, body.year, body.tz_name,
+                                          upstream=_weather_upstream)
         elif body.source == "PVGIS TMY":
-            df, meta = fetch_pvgis_tmy(body.lat, body.lon, body.tz_name)
+            df, meta = fetch_pvgis_tmy(body.lat, body.lon, body.tz_name, upstream=_weather_upstream)
         elif body.source == "NASA POWER":
             if not body.year:
                 raise HTTPException(status_code=400, detail="Year required for NASA POWER")
             start = pd.Timestamp(f"{body.year}-01-01", tz="UTC")
             end   = pd.Timestamp(f"{body.year}-12-31 23:00:00", tz="UTC")
-            df, meta = fetch_nasa_power_hourly(body.lat, body.lon, start, end, body.tz_name)
+            df, meta = fetch_nasa_power_hourly(body.lat, body.lon, start, end, body.tz_name,
+                                               upstream=_weather_upstream)
         else:
             raise HTTPException(status_code=400, detail="Invalid source")
             
@@ -93,10 +171,11 @@ def fetch_weather(body: FetchQuery):
         if not df.index.name:
             df_reset.rename(columns={"index": "time"}, inplace=True)
             
-        df_json = json.loads(df_reset.to_json(orient="records", date_format="iso"))
         meta_dict = meta if isinstance(meta, dict) else meta.__dict__
         
-        return {"weather": df_json, "meta": meta_dict, "time_col": time_col}
+        return _json_response({"weather": _records(df_reset), "meta": meta_dict, "time_col": time_col})
+    except UpstreamBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -104,14 +183,19 @@ def fetch_weather(body: FetchQuery):
 def upload_weather(file: UploadFile = File(...), tz_name: str = Form(...)):
     try:
         # Save to tempfile since read_epw expects a file path
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".epw") as tmp:
-            tmp.write(file.file.read())
-            tmp_path = Path(tmp.name)
-            
-        df, meta = read_epw(tmp_path, tz_name)
-        
-        # Clean up
-        tmp_path.unlink()
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".epw")
+        tmp_path = Path(tmp.name)
+        try:
+            try:
+                # stream in chunks instead of holding the whole upload in memory
+                shutil.copyfileobj(file.file, tmp, 1 << 20)
+            finally:
+                # closed before unlink/read_epw: Windows can't delete or reopen an open file
+                tmp.close()
+            df, meta = read_epw(tmp_path, tz_name)
+        finally:
+            # Clean up, also when the upload or parsing fails
+            tmp_path.unlink(missing_ok=True)
         
         # Format response
         df_reset = df.reset_index()
@@ -119,10 +203,9 @@ def upload_weather(file: UploadFile = File(...), tz_name: str = Form(...)):
         if not df.index.name:
             df_reset.rename(columns={"index": "time"}, inplace=True)
             
-        df_json = json.loads(df_reset.to_json(orient="records", date_format="iso"))
         meta_dict = meta if isinstance(meta, dict) else meta.__dict__
         
-        return {"weather": df_json, "meta": meta_dict, "time_col": time_col}
+        return _json_response({"weather": _records(df_reset), "meta": meta_dict, "time_col": time_col})
         
     except Exception as e:
         import traceback
@@ -154,6 +237,11 @@ def get_components(type: str = 'module', provider: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# rendered /api/simulate bodies keyed by (weather hash, config, site); newest last
+_SIM_CACHE: "OrderedDict[tuple, bytes]" = OrderedDict()
+_SIM_CACHE_SIZE = 8
+_SIM_CACHE_LOCK = threading.Lock()
+
 class SimulateQuery(BaseModel):
     weather: list
     time_col: str
@@ -169,19 +257,33 @@ def simulate(body: SimulateQuery):
         df[body.time_col] = pd.to_datetime(df[body.time_col])
         df.set_index(body.time_col, inplace=True)
         
+        # hash_pandas_object ignores labels, so column names and dtypes are keyed explicitly
+        key = (
+            int(pd.util.hash_pandas_object(df, index=True).sum()),
+            tuple(df.columns), tuple(map(str, df.dtypes)),
+            orjson.dumps(body.syscfg, option=orjson.OPT_SORT_KEYS),
+            body.lat, body.lon, body.tz_name,
+        )
+        with _SIM_CACHE_LOCK:
+            cached = _SIM_CACHE.get(key)
+            if cached is not None:
+                _SIM_CACHE.move_to_end(key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        
         # Ensure required met columns exist
-        if "temp_air" not in df.columns:
-            df["temp_air"] = 20.0
-        else:
-            df["temp_air"] = df["temp_air"].fillna(20.0)
-        if "wind_speed" not in df.columns:
-            df["wind_speed"] = 1.0
-        else:
-            df["wind_speed"] = df["wind_speed"].fillna(1.0)
+        # fill only the missing rows; clean columns are left untouched
+        for col, default in (("temp_air", 20.0), ("wind_speed", 1.0)):
+            if col not in df.columns:
+                df[col] = default
+            else:
+                mask = df[col].isna()
+                if mask.any():
+                    df.loc[mask, col] = default
             
         # Derive DNI/DHI if missing
-        need_dni = ("dni" not in df.columns) or df["dni"].isna().all()
-        need_dhi = ("dhi" not in df.columns) or df["dhi"].isna().all()
+        need_dni = ("dni" not in df.columns) or not df["dni"].notna().any()
+        need_dhi = ("dhi" not in df.columns) or not df["dhi"].notna().any()
         deriv = {}
         if need_dni or need_dhi:
             df, deriv = derive_from_ghi(df, body.lat, body.lon, body.tz_name)
@@ -206,24 +308,28 @@ def simulate(body: SimulateQuery):
         daily = daily_df.reset_index()
         daily.rename(columns={daily.columns[0]: "time"}, inplace=True)
         
-        # Monthly array (convert W to kWh)
-        monthly_df = res_df.resample('MS').sum() / 1000.0
-        monthly_df.rename(columns={"ac_w": "ac_kwh", "dc_w": "dc_kwh", "poa_w": "poa_kwhm2"}, inplace=True)
+        # Monthly array, rolled up from the ~365 daily rows rather than the hourly series
+        monthly_df = daily_df.resample('MS').sum()
         monthly = monthly_df.reset_index()
         monthly.rename(columns={monthly.columns[0]: "time"}, inplace=True)
         
         # Make sure kpis has what frontend expects
         kpis["annual_energy"] = kpis["annual_kwh"]
             
-        return {
+        resp = _json_response({
             "series": {
-                "hourly": json.loads(hourly.to_json(orient="records", date_format="iso")),
-                "daily": json.loads(daily.to_json(orient="records", date_format="iso")),
-                "monthly": json.loads(monthly.to_json(orient="records", date_format="iso"))
+                "hourly": _records(hourly),
+                "daily": _records(daily),
+                "monthly": _records(monthly)
             },
             "kpis": kpis,
             "derived_methods": deriv
-        }
+        })
+        with _SIM_CACHE_LOCK:
+            _SIM_CACHE[key] = resp.body
+            while len(_SIM_CACHE) > _SIM_CACHE_SIZE:
+                _SIM_CACHE.popitem(last=False)
+        return resp
     except Exception as e:
         import traceback
         traceback.print_exc()
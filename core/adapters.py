@@ -1,6 +1,8 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 from pvlib import iotools
@@ -15,37 +17,51 @@ class SourceMeta:
     conversions: dict
     derived: dict
 
+_PVGIS_MAP = {
+    "G(h)": "ghi", "Gb(n)": "dni", "Gd(h)": "dhi",
+    "T2m": "temp_air", "WS10m": "wind_speed", "SP": "pressure",
+}
+
 def _normalize_pvgis(df: pd.DataFrame) -> pd.DataFrame:
-    return df.rename(columns={
-        "G(h)": "ghi", "Gb(n)": "dni", "Gd(h)": "dhi",
-        "T2m": "temp_air", "WS10m": "wind_speed", "SP": "pressure",
-    })
+    # freshly parsed frame owned by the caller: relabel in place rather than copy
+    df.columns = [_PVGIS_MAP.get(c, c) for c in df.columns]
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
 
-def fetch_pvgis_hourly(lat, lon, year, tz_name):
-    key = {"src":"pvgis", "lat":lat, "lon":lon, "year":year}
+def _direct(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+# fetch_* take an optional `upstream(fn, *args, **kwargs)` wrapper that runs only the
+# network request, so callers can gate/retry it without holding a slot on cache hits
+
+def fetch_pvgis_hourly(lat, lon, year, tz_name, upstream=_direct):
+    key = {"src":"pvgis", "lat":round(lat, 4), "lon":round(lon, 4), "year":year}
     cached = get_cached_df("pvgis", key)
     if cached is not None:
-        df, conv = convert_to_canonical(cached)
+        df, conv = convert_to_canonical(ensure_tz_aware(cached, tz_name))
         return df, SourceMeta("PVGIS", {"year": year}, conv, {"dni":"measured","dhi":"measured"})
-    data, meta = iotools.get_pvgis_hourly(latitude=lat, longitude=lon,
-                                          start=year, end=year, components=True)
+    data, meta = upstream(iotools.get_pvgis_hourly, latitude=lat, longitude=lon,
+                          start=year, end=year, components=True)
     df = _normalize_pvgis(data)
-    df.index = pd.to_datetime(df.index, utc=True)
     df = ensure_tz_aware(df, tz_name)
     df, conv = convert_to_canonical(df)
     set_cached_df("pvgis", key, df)
     return df, SourceMeta("PVGIS", {"meta":meta}, conv, {"dni":"measured","dhi":"measured"})
 
-def fetch_pvgis_tmy(lat, lon, tz_name):
-    data, meta = iotools.get_pvgis_tmy(lat, lon, map_variables=True, usehorizon=True)
-    df = data.rename(columns={"G(h)":"ghi","Gb(n)":"dni","Gd(h)":"dhi",
-                              "T2m":"temp_air","WS10m":"wind_speed","SP":"pressure"})
-    df.index = pd.to_datetime(df.index, utc=True)
+def fetch_pvgis_tmy(lat, lon, tz_name, upstream=_direct):
+    key = {"src":"pvgis_tmy", "lat":round(lat, 4), "lon":round(lon, 4)}
+    cached = get_cached_df("pvgis_tmy", key)
+    if cached is not None:
+        df, conv = convert_to_canonical(ensure_tz_aware(cached, tz_name))
+        return df, SourceMeta("PVGIS TMY", {}, conv, {"dni":"measured","dhi":"measured"})
+    data, meta = upstream(iotools.get_pvgis_tmy, lat, lon, map_variables=True, usehorizon=True)
+    df = _normalize_pvgis(data)
     df = ensure_tz_aware(df, tz_name)
     df, conv = convert_to_canonical(df)
+    set_cached_df("pvgis_tmy", key, df)
     return df, SourceMeta("PVGIS TMY", {"meta":meta}, conv, {"dni":"measured","dhi":"measured"})
 
-def fetch_nasa_power_hourly(lat, lon, start, end, tz_name):
+def fetch_nasa_power_hourly(lat, lon, start, end, tz_name, upstream=_direct):
     start_s = start.strftime("%Y%m%d")
     end_s = end.strftime("%Y%m%d")
     params = ",".join(["ALLSKY_SFC_SW_DWN", "T2M", "WS2M", "PS"])
@@ -54,31 +70,38 @@ def fetch_nasa_power_hourly(lat, lon, start, end, tz_name):
         f"parameters={params}&community=RE&longitude={lon:.5f}&latitude={lat:.5f}"
         f"&start={start_s}&end={end_s}&format=JSON&time-standard=UTC"
     )
-    key = {"src":"nasa_power", "lat":lat, "lon":lon, "start":start_s, "end":end_s}
+    key = {"src":"nasa_power", "lat":round(lat, 4), "lon":round(lon, 4), "start":start_s, "end":end_s}
     cached = get_cached_df("nasa", key)
     if cached is not None:
-        df, conv = convert_to_canonical(cached)
+        df, conv = convert_to_canonical(ensure_tz_aware(cached, tz_name))
         return df, SourceMeta("NASA POWER Hourly", {"url": url}, conv, {"dni":"derived","dhi":"derived"})
-    r = requests.get(url, timeout=60)
-    r.raise_for_status()
-    js = r.json()
+
+    def get():
+        r = requests.get(url, timeout=60)
+        r.raise_for_status()
+        return r
+
+    r = upstream(get)
+    js = orjson.loads(r.content)
     base = js["properties"]["parameter"]
+    # POWER returns every parameter on the same chronologically ordered hourly keys
+    ts_keys = next((tuple(v) for v in base.values() if v), ())
+    idx = pd.to_datetime(list(ts_keys), format="%Y%m%d%H", utc=True)
 
-    def series_for(k):
+    def values_for(k):
         data = base.get(k, {})
         if not data:
-            return pd.Series(dtype=float)
-        s = pd.Series(data).sort_index()
-        idx = pd.to_datetime(s.index, format="%Y%m%d%H", utc=True)
-        s.index = idx
-        return s.astype(float)
+            return np.full(len(idx), np.nan)
+        if tuple(data) != ts_keys:
+            return pd.Series(data, dtype=float).reindex(ts_keys).to_numpy()
+        return np.fromiter(data.values(), dtype=np.float64, count=len(idx))
 
     df = pd.DataFrame({
-        "ghi": series_for("ALLSKY_SFC_SW_DWN"),
-        "temp_air": series_for("T2M"),
-        "wind_speed": series_for("WS2M"),
-        "pressure": series_for("PS"),
-    }).dropna(how="all")
+        "ghi": values_for("ALLSKY_SFC_SW_DWN"),
+        "temp_air": values_for("T2M"),
+        "wind_speed": values_for("WS2M"),
+        "pressure": values_for("PS"),
+    }, index=idx).dropna(how="all")
     df, conv = convert_to_canonical(df)
     df = ensure_tz_aware(df, tz_name)
     set_cached_df("nasa", key, df)
@@ -1,29 +1,37 @@
 import hashlib
 import tempfile
+from functools import cache
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
 
 CACHE_ROOT = Path(tempfile.gettempdir()) / "pvlib_data_cache"
 CACHE_ROOT.mkdir(parents=True, exist_ok=True)
 
 def _hash_key(key_parts: dict) -> str:
     s = "|".join(f"{k}={v}" for k, v in sorted(key_parts.items()))
-    return hashlib.sha256(s.encode()).hexdigest()[:16]
+    return hashlib.blake2b(s.encode(), digest_size=8).hexdigest()
 
 def cache_path(prefix: str, key_parts: dict) -> Path:
-    return CACHE_ROOT / f"{prefix}-{_hash_key(key_parts)}.parquet"
+    return CACHE_ROOT / f"{prefix}-{_hash_key(key_parts)}.arrow"
 
 def get_cached_df(prefix: str, key_parts: dict) -> pd.DataFrame | None:
     p = cache_path(prefix, key_parts)
     if p.exists():
-        return pd.read_parquet(p)
+        # plain read, consolidated blocks: hits return writable frames just like misses
+        with pa.OSFile(str(p), "rb") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas()
     return None
 
 def set_cached_df(prefix: str, key_parts: dict, df: pd.DataFrame) -> Path:
     p = cache_path(prefix, key_parts)
-    df.to_parquet(p, index=True)
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    with pa.OSFile(str(p), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
     return p
 
+@cache
 def export_dir() -> Path:
     d = CACHE_ROOT / "exports"
     d.mkdir(parents=True, exist_ok=True)
@@ -9,11 +9,11 @@ def derive_from_ghi(df: pd.DataFrame, lat: float, lon: float, tz_name: str) -> t
     times = out.index
     sp = solarposition.get_solarposition(times, lat, lon)
     zen = sp["zenith"]
-    if "dni" not in out or out["dni"].isna().all():
+    if "dni" not in out or not out["dni"].notna().any():
         dni = irradiance.dirint(out["ghi"].fillna(0), zen, times)  # DIRINT for DNI :contentReference[oaicite:11]{index=11}
         out["dni"] = dni
         derived["dni"] = "dirint"
-    if "dhi" not in out or out["dhi"].isna().all():
+    if "dhi" not in out or not out["dhi"].notna().any():
         # ERBS uses GHI + zenith to split diffuse/beam  :contentReference[oaicite:12]{index=12}
         er = irradiance.erbs(out["ghi"].fillna(0), zen, times)
         out["dhi"] = er["dhi"]
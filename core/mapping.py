@@ -1,6 +1,8 @@
 from __future__ import annotations
 import re
 import math
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 # canonical names & units
@@ -24,19 +26,34 @@ FUZZY = {
     "albedo": ["albedo", "rho"],
 }
 
-def guess_column(name: str) -> str | None:
-    n = re.sub(r"[^a-z0-9]", "", name.lower())
+_NONALNUM = re.compile(r"[^a-z0-9]")
+
+def _scan_fuzzy(n: str) -> str | None:
     for canonical, candidates in FUZZY.items():
         if any(n.startswith(c) or c in n for c in candidates):
             return canonical
     return None
 
+# exact hits resolved up front with the same precedence as the fuzzy scan
+_EXACT = {
+    n: _scan_fuzzy(n)
+    for n in (_NONALNUM.sub("", c) for candidates in FUZZY.values() for c in candidates)
+}
+
+@lru_cache(maxsize=512)
+def guess_column(name: str) -> str | None:
+    n = _NONALNUM.sub("", name.lower())
+    if n in _EXACT:
+        return _EXACT[n]
+    return _scan_fuzzy(n)
+
 def infer_units(series_name: str, series: pd.Series, freq_seconds: int | None = None) -> str | None:
     sname = series_name.lower()
-    v = series.dropna().astype(float)
-    if v.empty:
+    a = series.to_numpy(dtype=np.float64, copy=False)
+    v = a[~np.isnan(a)]
+    if v.size == 0:
         return None
-    mean = v.iloc[: min(500, len(v))].mean()
+    mean = float(v[:500].mean())
     if series_name in ["pressure", "ps", "pres", "sp"]:
         # if ~100 -> kPa, if ~1000 -> hPa, if ~100000 -> Pa
         if 70 < mean < 110:
@@ -58,7 +75,6 @@ def energy_to_power_kwhm2_to_wm2(s: pd.Series, freq_seconds: int) -> pd.Series:
     return s.astype(float) * factor
 
 def convert_to_canonical(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
-    df = df.copy()
     # detect freq
     if isinstance(df.index, pd.DatetimeIndex) and df.index.freqstr:
         freq_seconds = int(pd.to_timedelta(df.index.freq).total_seconds())
@@ -67,37 +83,44 @@ def convert_to_canonical(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
         diffs = df.index.to_series().diff().dropna().dt.total_seconds()
         freq_seconds = int(diffs.median()) if not diffs.empty else 3600
 
+    col_to_canon = {c: guess_column(c) for c in df.columns}
     conversions = {}
+    # converted columns only; untouched columns are never copied
+    new_cols = {}
     # pressure
     for col in list(df.columns):
         low = col.lower()
         if low in ["pressure", "ps", "pres", "sp"]:
             units = infer_units("pressure", df[col])
             if units == "kPa":
-                df[col] = df[col].astype(float) * 1000.0
+                new_cols[col] = df[col].to_numpy(dtype=float) * 1000.0
                 conversions[col] = ("kPa", "Pa")
             elif units == "hPa":
-                df[col] = df[col].astype(float) * 100.0
+                new_cols[col] = df[col].to_numpy(dtype=float) * 100.0
                 conversions[col] = ("hPa", "Pa")
             else:
                 conversions[col] = ("Pa", "Pa")
 
     # irradiance possibly in kWh/m2
     for q in ["ghi", "dni", "dhi"]:
-        for col in list(df.columns):
-            if guess_column(col) == q:
+        for col in df.columns:
+            if col_to_canon[col] == q:
                 units = infer_units(q, df[col], freq_seconds=freq_seconds)
                 if units == "kWh/m^2":
-                    df[col] = energy_to_power_kwhm2_to_wm2(df[col], freq_seconds)
+                    new_cols[col] = energy_to_power_kwhm2_to_wm2(df[col], freq_seconds)
                     conversions[col] = ("kWh/m^2", "W/m^2")
                 elif units == "W/m^2":
                     conversions[col] = ("W/m^2", "W/m^2")
 
     # rename to canonical where possible
     rename = {}
-    for col in df.columns:
-        g = guess_column(col)
+    for col, g in col_to_canon.items():
         if g and g not in df.columns:
             rename[col] = g
-    df = df.rename(columns=rename)
+    if new_cols or rename:
+        # shallow copy: setting/relabelling columns must not touch the caller's frame
+        df = df.copy(deep=False)
+        for col, values in new_cols.items():
+            df[col] = values
+        df.columns = [rename.get(c, c) for c in df.columns]
     return df, conversions
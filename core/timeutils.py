@@ -1,16 +1,21 @@
 from __future__ import annotations
+from functools import lru_cache
 import pandas as pd
 import requests
 
+@lru_cache(maxsize=1024)
+def _tz_lookup(lat: float, lon: float) -> str:
+    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&timezone=auto&current_weather=true"
+    res = requests.get(url, timeout=5)
+    res.raise_for_status()
+    return res.json().get("timezone", "UTC")
+
 def tz_name_from_latlon(lat: float, lon: float) -> str:
+    # ~100 m rounding gives stable cache keys; failures raise and are never cached
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&timezone=auto&current_weather=true"
-        res = requests.get(url, timeout=5)
-        if res.status_code == 200:
-            return res.json().get("timezone", "UTC")
+        return _tz_lookup(round(lat, 3), round(lon, 3))
     except Exception:
-        pass
-    return "UTC"
+        return "UTC"
 
 def localize_index(idx: pd.DatetimeIndex, tz_name: str) -> pd.DatetimeIndex:
     if idx.tz is None:
@@ -18,6 +23,7 @@ def localize_index(idx: pd.DatetimeIndex, tz_name: str) -> pd.DatetimeIndex:
     return idx.tz_convert(tz_name)
 
 def ensure_tz_aware(df: pd.DataFrame, tz_name: str) -> pd.DataFrame:
-    df = df.copy()
+    # only the index changes, so a shallow copy is enough
+    df = df.copy(deep=False)
     df.index = localize_index(df.index, tz_name)
     return df